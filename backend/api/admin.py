@@ -1,3 +1,35 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AnalysisJob, ChatBackfill, KnownClaim, MessageVerdict, StoredMessage
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'chat_id', 'first_message_id', 'last_message_id', 'priority', 'status', 'attempts', 'run_after')
+    list_filter = ('status', 'priority')
+    search_fields = ('chat_id', 'dedup_key')
+
+
+@admin.register(ChatBackfill)
+class ChatBackfillAdmin(admin.ModelAdmin):
+    list_display = ('chat_id', 'status', 'messages_fetched', 'total_messages', 'pages_fetched', 'jobs_queued', 'updated_at')
+    list_filter = ('status',)
+
+
+@admin.register(StoredMessage)
+class StoredMessageAdmin(admin.ModelAdmin):
+    list_display = ('chat_id', 'message_id', 'sender_name', 'timestamp')
+    search_fields = ('chat_id', 'content')
+
+
+@admin.register(KnownClaim)
+class KnownClaimAdmin(admin.ModelAdmin):
+    list_display = ('id', 'content', 'chat_id', 'created_at')
+    search_fields = ('content',)
+    exclude = ('signature',)
+
+
+@admin.register(MessageVerdict)
+class MessageVerdictAdmin(admin.ModelAdmin):
+    list_display = ('chat_id', 'message_id', 'updated_at')
+    search_fields = ('chat_id',)
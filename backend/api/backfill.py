@@ -0,0 +1,249 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .jobs import enqueue_analysis, stored_verdicts
+from .models import AnalysisJob, ChatBackfill, StoredMessage
+
+BACKFILL_PAGE_SIZE = getattr(settings, 'BACKFILL_PAGE_SIZE', 200)
+BACKFILL_THROTTLE_SECONDS = getattr(settings, 'BACKFILL_THROTTLE_SECONDS', 1.0)
+BACKFILL_ANALYSIS_CHUNK_SIZE = getattr(settings, 'BACKFILL_ANALYSIS_CHUNK_SIZE', 100)
+BACKFILL_MAX_FLOOD_WAITS = 5
+# A running backfill not saved for this long belongs to a process that died and may be taken over
+BACKFILL_LEASE_SECONDS = getattr(settings, 'BACKFILL_LEASE_SECONDS', 300)
+# How often a waiting backfill re-reads the pause flag and refreshes its lease
+BACKFILL_PAUSE_POLL_SECONDS = 5
+
+# Fields written while a backfill runs; pause_requested is left alone so a pause from another process is never overwritten
+PROGRESS_FIELDS = ['status', 'offset_id', 'total_messages', 'messages_fetched', 'messages_stored',
+                   'pages_fetched', 'jobs_queued', 'last_error', 'started_at', 'finished_at', 'updated_at']
+
+# Stop events of backfill threads in this process, so a local pause also interrupts their waits
+_stop_events = {}
+_stop_events_lock = threading.Lock()
+
+
+class BackfillRunning(Exception):
+    """Raised when another thread or process is already running a chat's backfill"""
+
+
+def _store_page(chat_id, messages):
+    """Save a page of MessageRecords, skipping any stored by an earlier run"""
+    StoredMessage.objects.bulk_create([
+        StoredMessage(
+            chat_id=str(chat_id),
+            message_id=int(msg.id),
+            sender_id=msg.sender_id,
+            sender_name=msg.sender_name,
+            content=msg.content,
+            timestamp=datetime.fromisoformat(msg.timestamp),
+        )
+        for msg in messages
+    ], ignore_conflicts=True)
+
+
+def claim_backfill(chat_id, restart=False):
+    """Mark a chat's backfill as running and return it.
+
+    The ChatBackfill row is the lock: it is taken with a conditional update on
+    ``status``, so only one thread in one process can run a chat at a time.
+    A finished backfill is returned unchanged unless ``restart`` is set.
+    Raises BackfillRunning if the backfill is already held.
+    """
+    chat_id = str(chat_id)
+    backfill, _ = ChatBackfill.objects.get_or_create(chat_id=chat_id)
+    if backfill.status == ChatBackfill.STATUS_DONE and not restart:
+        return backfill
+
+    now = timezone.now()
+    updates = {'status': ChatBackfill.STATUS_RUNNING, 'pause_requested': False, 'last_error': '', 'updated_at': now}
+    if restart:
+        updates.update(offset_id=0, messages_fetched=0, messages_stored=0, pages_fetched=0, jobs_queued=0,
+                       total_messages=None, started_at=now, finished_at=None)
+    claimed = (ChatBackfill.objects
+               .filter(pk=backfill.pk)
+               .filter(~Q(status=ChatBackfill.STATUS_RUNNING) |
+                       Q(updated_at__lt=now - timedelta(seconds=BACKFILL_LEASE_SECONDS)))
+               .update(**updates))
+    if not claimed:
+        raise BackfillRunning(f"Backfill already running for chat {chat_id}")
+
+    backfill.refresh_from_db()
+    if not backfill.offset_id and not restart:
+        backfill.started_at = now
+        backfill.save(update_fields=['started_at', 'updated_at'])
+    return backfill
+
+
+def pause_backfill(chat_id):
+    """Ask a running backfill to pause after its current page, whichever process runs it"""
+    chat_id = str(chat_id)
+    requested = ChatBackfill.objects.filter(chat_id=chat_id, status=ChatBackfill.STATUS_RUNNING).update(
+        pause_requested=True)
+    with _stop_events_lock:
+        stop_event = _stop_events.get(chat_id)
+    if stop_event is not None:
+        stop_event.set()
+    return bool(requested)
+
+
+def _pause_requested(backfill, stop_event):
+    return stop_event.is_set() or ChatBackfill.objects.filter(pk=backfill.pk, pause_requested=True).exists()
+
+
+def _wait(backfill, seconds, stop_event):
+    """Sleep for ``seconds`` unless a pause is requested first; returns True if paused"""
+    waited_until = time.monotonic() + seconds
+    while True:
+        if _pause_requested(backfill, stop_event):
+            return True
+        remaining = waited_until - time.monotonic()
+        if remaining <= 0:
+            return False
+        # Long FloodWaits must not let the lease go stale
+        ChatBackfill.objects.filter(pk=backfill.pk).update(updated_at=timezone.now())
+        stop_event.wait(min(remaining, BACKFILL_PAUSE_POLL_SECONDS))
+
+
+def _finish(backfill, status, last_error=''):
+    backfill.status = status
+    backfill.last_error = last_error
+    if status == ChatBackfill.STATUS_DONE:
+        backfill.finished_at = timezone.now()
+    backfill.save(update_fields=PROGRESS_FIELDS)
+    ChatBackfill.objects.filter(pk=backfill.pk).update(pause_requested=False)
+    return backfill
+
+
+def run_backfill(service, chat_id, page_size=BACKFILL_PAGE_SIZE, throttle=BACKFILL_THROTTLE_SECONDS,
+                 analysis_chunk_size=BACKFILL_ANALYSIS_CHUNK_SIZE, max_pages=None, restart=False,
+                 progress=None, stop_event=None):
+    """Fetch a chat's whole history page by page, storing and queueing analysis for each page.
+
+    The checkpoint is saved after every page, so an interrupted backfill
+    resumes where it stopped. Only one page is held in memory at a time.
+    Raises BackfillRunning if the chat is already being backfilled elsewhere.
+    """
+    backfill = claim_backfill(chat_id, restart=restart)
+    if backfill.status != ChatBackfill.STATUS_RUNNING:
+        return backfill
+    return _fetch_pages(service, backfill, page_size, throttle, analysis_chunk_size, max_pages, progress, stop_event)
+
+
+def _fetch_pages(service, backfill, page_size=BACKFILL_PAGE_SIZE, throttle=BACKFILL_THROTTLE_SECONDS,
+                 analysis_chunk_size=BACKFILL_ANALYSIS_CHUNK_SIZE, max_pages=None, progress=None, stop_event=None):
+    """Run a claimed backfill until it finishes, fails, pauses or reaches ``max_pages``"""
+    chat_id = backfill.chat_id
+    if stop_event is None:
+        stop_event = threading.Event()
+
+    try:
+        pages = 0
+        flood_waits = 0
+        while max_pages is None or pages < max_pages:
+            if _pause_requested(backfill, stop_event):
+                return _finish(backfill, ChatBackfill.STATUS_PAUSED)
+
+            page = service.get_history_page(chat_id, offset_id=backfill.offset_id, page_size=page_size,
+                                            include_total=backfill.total_messages is None)
+            if not page['success']:
+                if page.get('retry_after') is not None and flood_waits < BACKFILL_MAX_FLOOD_WAITS:
+                    flood_waits += 1
+                    if _wait(backfill, page['retry_after'], stop_event):
+                        return _finish(backfill, ChatBackfill.STATUS_PAUSED)
+                    continue
+                return _finish(backfill, ChatBackfill.STATUS_FAILED, page['error'])
+            flood_waits = 0
+
+            if page['total'] is not None:
+                backfill.total_messages = page['total']
+
+            if page['next_offset_id'] is None:
+                _finish(backfill, ChatBackfill.STATUS_DONE)
+                if progress:
+                    progress(backfill)
+                return backfill
+
+            messages = page['messages']
+            if messages:
+                _store_page(chat_id, messages)
+                # Messages already analysed, e.g. on an earlier run or when the chat was opened, are not queued again
+                verdicts = stored_verdicts(chat_id, messages)
+                pending = [msg for msg in messages if msg.id not in verdicts]
+                for start in range(0, len(pending), analysis_chunk_size):
+                    enqueue_analysis(chat_id, pending[start:start + analysis_chunk_size],
+                                     priority=AnalysisJob.PRIORITY_BACKFILL)
+                    backfill.jobs_queued += 1
+
+            backfill.offset_id = page['next_offset_id']
+            backfill.messages_fetched += page['fetched']
+            backfill.messages_stored += len(messages)
+            backfill.pages_fetched += 1
+            backfill.save(update_fields=PROGRESS_FIELDS)
+            pages += 1
+
+            if progress:
+                progress(backfill)
+            if throttle and _wait(backfill, throttle, stop_event):
+                return _finish(backfill, ChatBackfill.STATUS_PAUSED)
+
+        return _finish(backfill, ChatBackfill.STATUS_PAUSED)
+    except KeyboardInterrupt:
+        _finish(backfill, ChatBackfill.STATUS_PAUSED)
+        raise
+    except Exception as e:
+        # Release the lock so the backfill can be resumed straight away
+        _finish(backfill, ChatBackfill.STATUS_FAILED, str(e))
+        raise
+
+
+def start_backfill_thread(service, chat_id, restart=False, **kwargs):
+    """Run a backfill in a background thread unless one is already running for the chat anywhere"""
+    chat_id = str(chat_id)
+    try:
+        backfill = claim_backfill(chat_id, restart=restart)
+    except BackfillRunning:
+        return False
+    if backfill.status != ChatBackfill.STATUS_RUNNING:
+        return True
+
+    stop_event = threading.Event()
+    with _stop_events_lock:
+        _stop_events[chat_id] = stop_event
+
+    def run():
+        try:
+            _fetch_pages(service, backfill, stop_event=stop_event, **kwargs)
+        except Exception as e:
+            print(f"Backfill error for chat {chat_id}: {e}")
+        finally:
+            with _stop_events_lock:
+                if _stop_events.get(chat_id) is stop_event:
+                    del _stop_events[chat_id]
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return True
+
+
+def backfill_status(backfill):
+    """Serialise a backfill checkpoint for API responses"""
+    return {
+        'chatId': backfill.chat_id,
+        'status': backfill.status,
+        'progress': backfill.progress(),
+        'totalMessages': backfill.total_messages,
+        'messagesFetched': backfill.messages_fetched,
+        'messagesStored': backfill.messages_stored,
+        'pagesFetched': backfill.pages_fetched,
+        'jobsQueued': backfill.jobs_queued,
+        'error': backfill.last_error or None,
+        'startedAt': backfill.started_at.isoformat() if backfill.started_at else None,
+        'finishedAt': backfill.finished_at.isoformat() if backfill.finished_at else None,
+        'updatedAt': backfill.updated_at.isoformat() if backfill.updated_at else None
+    }
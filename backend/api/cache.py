@@ -0,0 +1,203 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .deadline import DeadlineExceeded
+
+MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry expiry.
+
+    Values are stored by reference, so callers must not mutate what they get back.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _Flight:
+    """A computation in progress that other threads in this process can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = MISSING
+        self.error = None
+
+
+class TieredCache:
+    """In-process LRU in front of an optional cache shared by all worker processes.
+
+    The shared tier is any Django cache alias (database/SQLite or Redis), so
+    every gunicorn/uvicorn worker sees the same entries. ``get_or_compute``
+    coalesces identical concurrent requests: within a process through an
+    in-memory flight, and across processes through a lock taken with the
+    shared cache's atomic ``add``.
+    """
+
+    def __init__(self, shared_alias=None, local_max_entries=1000, lock_timeout=60, poll_interval=0.05, enabled=True):
+        self.enabled = enabled
+        self.local = LRUCache(local_max_entries)
+        self.shared_alias = shared_alias
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _shared_call(self, method, *args, default=None):
+        """Call the shared cache, treating an unavailable backend as a miss"""
+        try:
+            return getattr(self.shared, method)(*args)
+        except Exception as e:
+            print(f"Shared cache error ({method}): {e}")
+            return default
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not MISSING or not self.shared_alias:
+            return value
+
+        value = self._shared_call('get', key, MISSING, default=MISSING)
+        if value is not MISSING:
+            # Keep shared hits briefly in front; the shared tier owns the real expiry
+            self.local.set(key, value, min(self.lock_timeout, 5))
+        return value
+
+    def set(self, key, value, timeout):
+        self.local.set(key, value, timeout)
+        if self.shared_alias:
+            self._shared_call('set', key, value, timeout)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared_alias:
+            self._shared_call('delete', key)
+
+    def get_or_compute(self, key, compute, timeout, deadline=None, cache_if=None):
+        """Return the cached value for ``key`` or compute it exactly once across callers.
+
+        ``cache_if`` decides whether a computed value may be stored (failed or
+        degraded results usually should not be). Waiting callers give up with
+        DeadlineExceeded when their deadline passes. If the computing caller
+        runs out of its own time, waiting callers with time left take over
+        rather than failing with it.
+        """
+        if not self.enabled:
+            return compute()
+
+        while True:
+            value = self.get(key)
+            if value is not MISSING:
+                return value
+
+            with self._flights_lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+
+            if leader:
+                break
+
+            if not flight.done.wait(deadline.remaining() if deadline else None):
+                raise DeadlineExceeded('Request timed out')
+            if isinstance(flight.error, DeadlineExceeded) and not (deadline and deadline.expired()):
+                # The leader's deadline is not ours; try again, possibly as the new leader
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._compute_once(key, compute, timeout, deadline, cache_if)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _compute_once(self, key, compute, timeout, deadline, cache_if):
+        """Compute under the cross-process lock, or wait for the process holding it"""
+        def store(value):
+            if cache_if is None or cache_if(value):
+                self.set(key, value, timeout)
+            return value
+
+        if not self.shared_alias:
+            return store(compute())
+
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        waited_since = time.monotonic()
+        while True:
+            if self._shared_call('add', lock_key, token, self.lock_timeout, default=True):
+                try:
+                    # Another process may have finished between our miss and taking the lock
+                    value = self._shared_call('get', key, MISSING, default=MISSING)
+                    if value is not MISSING:
+                        self.local.set(key, value, min(self.lock_timeout, 5))
+                        return value
+                    return store(compute())
+                finally:
+                    if self._shared_call('get', lock_key) == token:
+                        self._shared_call('delete', lock_key)
+
+            value = self._shared_call('get', key, MISSING, default=MISSING)
+            if value is not MISSING:
+                self.local.set(key, value, min(self.lock_timeout, 5))
+                return value
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded('Request timed out')
+            if time.monotonic() - waited_since > self.lock_timeout:
+                # The lock holder died or its result was not cacheable; do the work ourselves
+                return store(compute())
+            time.sleep(self.poll_interval)
+
+
+service_cache = TieredCache(
+    enabled=getattr(settings, 'SERVICE_CACHE_ENABLED', True),
+    shared_alias=getattr(settings, 'SERVICE_CACHE_SHARED_ALIAS', None),
+    local_max_entries=getattr(settings, 'SERVICE_CACHE_LOCAL_MAX_ENTRIES', 1000),
+    lock_timeout=getattr(settings, 'SERVICE_CACHE_LOCK_TIMEOUT', 60),
+)
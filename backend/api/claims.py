@@ -0,0 +1,201 @@
+import hashlib
+import random
+from array import array
+import re
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError
+
+from .models import KnownClaim
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = (1 << 61) - 1
+
+CLAIM_MATCH_THRESHOLD = getattr(settings, 'CLAIM_MATCH_THRESHOLD', 0.7)
+CLAIM_MIN_TOKENS = getattr(settings, 'CLAIM_MIN_TOKENS', 4)
+CLAIM_INDEX_REFRESH_SECONDS = getattr(settings, 'CLAIM_INDEX_REFRESH_SECONDS', 10)
+
+# Fixed seed so signatures stored in the database stay comparable across processes and restarts
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def normalize(text):
+    """Lowercase and strip punctuation so trivial edits do not hide a known claim"""
+    return ' '.join(_NON_WORD.sub(' ', text.lower()).split())
+
+
+def content_hash(normalized_text):
+    return hashlib.sha256(normalized_text.encode()).hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def _cached_signature(normalized_text):
+    # Chats are re-read often, so the same texts are looked up again and again.
+    # Packed 64-bit values take a fifth of the memory of a tuple of ints.
+    return array('Q', minhash_signature(normalized_text.split()))
+
+
+def minhash_signature(tokens):
+    """MinHash signature over hashed word n-grams of a token list"""
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {' '.join(tokens)}
+    else:
+        shingles = {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'little') for s in shingles]
+    # One row of permuted hashes per shingle; the signature is the column-wise minimum
+    rows = [[(a * h + b) % MERSENNE_PRIME for a, b in _PERMUTATIONS] for h in hashes]
+    return list(map(min, zip(*rows)))
+
+
+def estimated_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the n-gram sets behind two signatures"""
+    return sum(1 for x, y in zip(signature_a, signature_b) if x == y) / NUM_PERMUTATIONS
+
+
+def _bands(signature):
+    for band in range(LSH_BANDS):
+        yield band, hash(tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+
+
+class ClaimIndex:
+    """Nearest-neighbour index of known fake claims using MinHash and LSH banding.
+
+    Exact repeats are found with one dict lookup and near-duplicates through the
+    LSH buckets, so most messages are checked without touching the database or
+    the LLM. Claims are stored in KnownClaim and loaded incrementally, so claims
+    added by other processes show up within CLAIM_INDEX_REFRESH_SECONDS. Claims
+    deleted from KnownClaim (for example false positives removed in the admin)
+    drop out within the same interval. With ``persistent=False`` the index
+    lives only in memory.
+    """
+
+    def __init__(self, persistent=True, threshold=CLAIM_MATCH_THRESHOLD):
+        self.persistent = persistent
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._by_hash = {}
+        self._signatures = {}
+        self._buckets = {}
+        self._next_local_id = -1
+        self._last_loaded_id = 0
+        self._last_refresh = None
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _insert(self, claim_id, claim_hash, signature):
+        with self._lock:
+            existing_id = self._by_hash.get(claim_hash)
+            if existing_id == claim_id or (existing_id is not None and not self.persistent):
+                return
+            if existing_id is not None:
+                # The claim was deleted and stored again under a new id
+                self._remove(existing_id)
+            self._by_hash[claim_hash] = claim_id
+            self._signatures[claim_id] = array('Q', signature)
+            for band in _bands(signature):
+                self._buckets.setdefault(band, set()).add(claim_id)
+
+    def _remove(self, claim_id):
+        signature = self._signatures.pop(claim_id)
+        for band in _bands(signature):
+            self._buckets[band].discard(claim_id)
+
+    def _rebuild(self):
+        """Replace the whole index with the current contents of KnownClaim"""
+        index = ClaimIndex(persistent=True, threshold=self.threshold)
+        index._load(KnownClaim.objects.all())
+        with self._lock:
+            self._by_hash, self._signatures, self._buckets = index._by_hash, index._signatures, index._buckets
+            self._last_loaded_id = index._last_loaded_id
+
+    def _load(self, queryset):
+        rows = queryset.order_by('pk').values_list('pk', 'content_hash', 'signature')
+        for claim_id, claim_hash, signature in rows.iterator():
+            self._insert(claim_id, claim_hash, signature)
+            self._last_loaded_id = claim_id
+
+    def refresh(self, force=False):
+        """Load claims stored since the last refresh and forget deleted ones"""
+        if not self.persistent:
+            return
+        now = time.monotonic()
+        if not force and self._last_refresh is not None and now - self._last_refresh < CLAIM_INDEX_REFRESH_SECONDS:
+            return
+        self._last_refresh = now
+        self._load(KnownClaim.objects.filter(pk__gt=self._last_loaded_id))
+        # Ids only grow, so after loading new rows a count mismatch means claims were deleted
+        if KnownClaim.objects.count() != len(self._signatures):
+            self._rebuild()
+
+    def is_indexable(self, text):
+        """Whether ``text`` is long enough to be stored in and matched against the index"""
+        return len(normalize(text).split()) >= CLAIM_MIN_TOKENS
+
+    def lookup(self, text):
+        """Return the id of a known claim matching ``text``, or None"""
+        normalized = normalize(text)
+        tokens = normalized.split()
+        if len(tokens) < CLAIM_MIN_TOKENS:
+            return None
+
+        self.refresh()
+        # A rebuild swaps these tables, so read them once for a consistent view
+        by_hash, signatures, buckets = self._by_hash, self._signatures, self._buckets
+        claim_id = by_hash.get(content_hash(normalized))
+        if claim_id is not None or not signatures:
+            return claim_id
+
+        signature = _cached_signature(normalized)
+        candidates = set()
+        for band in _bands(signature):
+            candidates.update(buckets.get(band, ()))
+        best_id, best_score = None, self.threshold
+        for candidate in candidates:
+            candidate_signature = signatures.get(candidate)
+            if candidate_signature is None:
+                continue
+            score = estimated_similarity(signature, candidate_signature)
+            if score >= best_score:
+                best_id, best_score = candidate, score
+        return best_id
+
+    def add(self, text, chat_id=''):
+        """Record a message judged to be fake news"""
+        normalized = normalize(text)
+        tokens = normalized.split()
+        if len(tokens) < CLAIM_MIN_TOKENS:
+            return
+        claim_hash = content_hash(normalized)
+        if claim_hash in self._by_hash:
+            return
+
+        signature = minhash_signature(tokens)
+        if not self.persistent:
+            with self._lock:
+                claim_id = self._next_local_id
+                self._next_local_id -= 1
+            self._insert(claim_id, claim_hash, signature)
+            return
+
+        try:
+            claim, _ = KnownClaim.objects.get_or_create(
+                content_hash=claim_hash,
+                defaults={'content': text, 'signature': signature, 'chat_id': str(chat_id)},
+            )
+        except IntegrityError:
+            claim = KnownClaim.objects.get(content_hash=claim_hash)
+        self._insert(claim.pk, claim_hash, signature)
+
+
+claim_index = ClaimIndex()
@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an operation runs out of time or its caller went away"""
+
+
+class Deadline:
+    """Time budget for one request, shared by every sub-operation it starts.
+
+    A deadline can also be cancelled from another thread (for example when the
+    client disconnects), which ends the remaining work as if time had run out.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self._cancelled = threading.Event()
+
+    def remaining(self):
+        """Seconds left, never negative; zero once cancelled"""
+        if self._cancelled.is_set():
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.3f}s, cancelled={self.cancelled})"
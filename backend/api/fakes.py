@@ -0,0 +1,216 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from telethon.errors import FloodWaitError
+
+SAMPLE_TEXTS = [
+    "Good morning everyone!",
+    "Water supply will be shut down tomorrow from 9 AM for maintenance",
+    "Meeting with the committee on Friday at 6 PM in the clubhouse",
+    "Forward this to 10 groups or your account will be deleted",
+    "Has anyone seen a black cat near block C?",
+    "Reminder: maintenance fees are due by the 10th",
+    "Drinking hot water cures every virus, doctors confirmed",
+    "Thanks for organising the event yesterday",
+    "Lift in tower B is not working, technician is on the way",
+    "Can someone share the plumber's number?",
+]
+
+SAMPLE_NAMES = [
+    ("Asha", "Verma"), ("Rahul", "Mehta"), ("Priya", None), ("Karan", "Singh"),
+    ("Neha", "Gupta"), ("Vikram", None), ("Sara", "Khan"), ("Arjun", "Rao"),
+]
+
+
+class FakeSender:
+    def __init__(self, sender_id):
+        first_name, last_name = SAMPLE_NAMES[sender_id % len(SAMPLE_NAMES)]
+        self.id = sender_id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.username = f"user_{sender_id}"
+        self.phone = None
+
+
+class FakeMessage:
+    def __init__(self, chat_id, message_id, now):
+        self.id = message_id
+        self.chat_id = chat_id
+        self.sender_id = 1000 + (message_id * 7 + abs(chat_id)) % 50
+        self.sender = FakeSender(self.sender_id)
+        # Every 13th message is media-only, like stickers and photos in real chats
+        self.text = None if message_id % 13 == 0 else SAMPLE_TEXTS[(message_id + abs(chat_id)) % len(SAMPLE_TEXTS)]
+        self.date = now - timedelta(minutes=message_id)
+
+
+class FakeEntity:
+    def __init__(self, participants_count):
+        self.participants_count = participants_count
+
+
+class FakeDialog:
+    def __init__(self, dialog_id, name, message, is_channel=False):
+        self.id = dialog_id
+        self.name = name
+        self.message = message
+        self.is_group = not is_channel
+        self.is_channel = is_channel
+        self.unread_count = abs(dialog_id) % 17
+        self.entity = FakeEntity(20 + abs(dialog_id) % 480)
+
+
+class FakeMessageList(list):
+    """List of messages carrying the chat's total message count, like Telethon's TotalList"""
+    def __init__(self, items=(), total=0):
+        super().__init__(items)
+        self.total = total
+
+
+class FakeTelegramClient:
+    """In-memory stand-in for telethon.TelegramClient with synthetic dialogs and messages.
+
+    Message ids run from 1 (oldest) to ``messages_per_chat`` (newest) and are
+    generated on demand, so very large chats cost no memory until they are read.
+    """
+
+    def __init__(self, session=None, api_id=None, api_hash=None, dialogs=20,
+                 messages_per_chat=1000, latency=0.0, jitter=0.0,
+                 flood_wait_rate=0.0, flood_wait_seconds=5, seed=None):
+        self.session = session
+        self.dialogs = dialogs
+        self.messages_per_chat = messages_per_chat
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_wait_rate = flood_wait_rate
+        self.flood_wait_seconds = flood_wait_seconds
+        self._random = random.Random(seed)
+        self._connected = False
+        self._authorized = False
+        self._now = datetime.now(timezone.utc)
+
+    async def _simulate_request(self):
+        """Sleep for the configured latency and raise FloodWait at the configured rate"""
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.flood_wait_rate and self._random.random() < self.flood_wait_rate:
+            raise FloodWaitError(request=None, capture=self.flood_wait_seconds)
+
+    def _chat_ids(self):
+        return [-(1000000000 + i) for i in range(self.dialogs)]
+
+    def is_connected(self):
+        return self._connected
+
+    async def connect(self):
+        await self._simulate_request()
+        self._connected = True
+
+    async def disconnect(self):
+        self._connected = False
+
+    async def send_code_request(self, phone_number):
+        await self._simulate_request()
+        return type('SentCode', (), {'phone_code_hash': f"hash_{phone_number}"})()
+
+    async def sign_in(self, phone_number, code):
+        await self._simulate_request()
+        self._authorized = True
+
+    async def is_user_authorized(self):
+        return self._authorized
+
+    async def get_me(self):
+        await self._simulate_request()
+        me = FakeSender(1)
+        me.phone = '910000000000'
+        return me
+
+    async def iter_dialogs(self):
+        await self._simulate_request()
+        for index, chat_id in enumerate(self._chat_ids()):
+            last_message = FakeMessage(chat_id, self.messages_per_chat, self._now)
+            yield FakeDialog(chat_id, f"Test Group {index}", last_message, is_channel=index % 5 == 0)
+
+    async def get_participants(self, entity):
+        await self._simulate_request()
+        return [FakeSender(i) for i in range(entity.participants_count)]
+
+    async def iter_messages(self, entity, limit=None, offset_id=0):
+        """Yield messages newest first, starting below ``offset_id`` when it is set"""
+        await self._simulate_request()
+        chat_id = int(entity)
+        newest = self.messages_per_chat if not offset_id else min(offset_id - 1, self.messages_per_chat)
+        count = 0
+        for message_id in range(newest, 0, -1):
+            if limit is not None and count >= limit:
+                break
+            yield FakeMessage(chat_id, message_id, self._now)
+            count += 1
+
+    async def get_messages(self, entity, limit=100, offset_id=0):
+        messages = [msg async for msg in self.iter_messages(entity, limit=limit, offset_id=offset_id)]
+        return FakeMessageList(messages, total=self.messages_per_chat)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """Stand-in for genai.GenerativeModel that answers analysis prompts locally.
+
+    Verdicts are derived from keywords in each message so results are stable
+    between runs. ``malformed_rate`` controls how often the reply is not valid JSON.
+    """
+
+    INDEX_LINE = re.compile(r'^Index (\d+): \[[^\]]*\] (.*)$', re.MULTILINE)
+
+    def __init__(self, latency=0.0, jitter=0.0, malformed_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.malformed_rate = malformed_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            malformed = self.malformed_rate and self._random.random() < self.malformed_rate
+        timeout = kwargs.get('request_options', {}).get('timeout')
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError('Deadline exceeded')
+        if delay:
+            time.sleep(delay)
+        if malformed:
+            return FakeResponse('```json\n[{"index": 0, "isImportant": tru')
+
+        analysis = []
+        for match in self.INDEX_LINE.finditer(prompt):
+            content = match.group(2).lower()
+            has_event = 'meeting' in content or 'maintenance' in content
+            item = {
+                'index': int(match.group(1)),
+                'isImportant': 'shut down' in content or 'not working' in content or 'due' in content,
+                'isFakeNews': 'forward this' in content or 'cures' in content,
+                'hasEvent': has_event,
+            }
+            if has_event:
+                item['eventDetails'] = {
+                    'title': 'Maintenance' if 'maintenance' in content else 'Meeting',
+                    'date': 'tomorrow',
+                    'time': '9:00 AM',
+                    'description': match.group(2)[:80],
+                    'type': 'maintenance' if 'maintenance' in content else 'meeting',
+                }
+            analysis.append(item)
+        return FakeResponse('```json\n' + json.dumps(analysis) + '\n```')
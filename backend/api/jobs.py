@@ -0,0 +1,206 @@
+import hashlib
+import os
+import random
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .analysis import verdicts_by_message_id
+from .models import AnalysisJob, MessageVerdict
+from .records import MessageRecord
+
+# Seconds a worker may hold a job before another worker treats it as abandoned
+JOB_LEASE_SECONDS = getattr(settings, 'ANALYSIS_JOB_LEASE_SECONDS', 300)
+RETRY_BASE_SECONDS = getattr(settings, 'ANALYSIS_JOB_RETRY_BASE_SECONDS', 5)
+RETRY_MAX_SECONDS = getattr(settings, 'ANALYSIS_JOB_RETRY_MAX_SECONDS', 600)
+# Finished jobs are deleted after this long; their verdicts live on in MessageVerdict
+JOB_RETENTION_SECONDS = getattr(settings, 'ANALYSIS_JOB_RETENTION_SECONDS', 86400)
+PRUNE_INTERVAL_SECONDS = getattr(settings, 'ANALYSIS_JOB_PRUNE_INTERVAL_SECONDS', 3600)
+
+
+def analysis_dedup_key(chat_id, messages):
+    """Identify a unit of analysis work by chat and the exact message ids and contents"""
+    digest = hashlib.sha256(str(chat_id).encode())
+    for msg in messages:
+        digest.update(b'\0' + msg.id.encode() + b'\0' + msg.content.encode())
+    return digest.hexdigest()
+
+
+def enqueue_analysis(chat_id, messages, priority=AnalysisJob.PRIORITY_BACKFILL):
+    """Queue analysis of MessageRecords, reusing an identical pending or running job.
+
+    If an identical job is already queued with a lower priority its priority
+    is raised, so a chat the user opens overtakes its own background backfill.
+    """
+    dedup_key = analysis_dedup_key(chat_id, messages)
+    message_ids = [int(msg.id) for msg in messages]
+    payload = {'messages': [msg.to_payload() for msg in messages]}
+
+    for _ in range(3):
+        existing = AnalysisJob.objects.filter(dedup_key=dedup_key, status__in=AnalysisJob.ACTIVE_STATUSES).first()
+        if existing:
+            if priority > existing.priority:
+                AnalysisJob.objects.filter(pk=existing.pk).update(priority=priority)
+                existing.priority = priority
+            return existing
+        try:
+            with transaction.atomic():
+                return AnalysisJob.objects.create(
+                    chat_id=str(chat_id),
+                    first_message_id=min(message_ids),
+                    last_message_id=max(message_ids),
+                    dedup_key=dedup_key,
+                    priority=priority,
+                    payload=payload,
+                    run_after=timezone.now(),
+                )
+        except IntegrityError:
+            # Another process queued the same work between our lookup and insert
+            continue
+    raise RuntimeError(f"Could not enqueue analysis job {dedup_key}")
+
+
+def _content_hash(content):
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def stored_verdicts(chat_id, messages):
+    """Return saved verdicts, keyed by message id, for those MessageRecords analysed before.
+
+    A verdict only counts if the message text is unchanged since it was analysed.
+    """
+    rows = (MessageVerdict.objects
+            .filter(chat_id=str(chat_id), message_id__in=[int(msg.id) for msg in messages])
+            .values_list('message_id', 'content_hash', 'verdict'))
+    saved = {str(message_id): (content_hash, verdict) for message_id, content_hash, verdict in rows}
+    verdicts = {}
+    for msg in messages:
+        content_hash, verdict = saved.get(msg.id, (None, None))
+        if content_hash == _content_hash(msg.content):
+            verdicts[msg.id] = verdict
+    return verdicts
+
+
+def save_verdicts(chat_id, messages, verdicts):
+    """Store per-message verdicts so later requests covering these messages can reuse them"""
+    now = timezone.now()
+    MessageVerdict.objects.bulk_create([
+        MessageVerdict(chat_id=str(chat_id), message_id=int(msg.id), content_hash=_content_hash(msg.content),
+                       verdict=verdicts[msg.id], updated_at=now)
+        for msg in messages if msg.id in verdicts
+    ], update_conflicts=True, unique_fields=['chat_id', 'message_id'],
+        update_fields=['content_hash', 'verdict', 'updated_at'])
+
+
+def prune_finished_jobs(retention_seconds=JOB_RETENTION_SECONDS):
+    """Delete done and failed jobs last updated more than ``retention_seconds`` ago"""
+    cutoff = timezone.now() - timedelta(seconds=retention_seconds)
+    deleted, _ = (AnalysisJob.objects
+                  .filter(status__in=[AnalysisJob.STATUS_DONE, AnalysisJob.STATUS_FAILED], updated_at__lt=cutoff)
+                  .delete())
+    return deleted
+
+
+def claim_next_job(worker_id):
+    """Atomically take the highest priority runnable job, or return None.
+
+    Running jobs whose lease has expired belong to a worker that died or was
+    restarted, and are claimed again so no work is lost. A job that has
+    already used all its attempts this way is failed instead, so a job that
+    keeps killing its worker is not re-run forever.
+    """
+    now = timezone.now()
+    (AnalysisJob.objects
+     .filter(status=AnalysisJob.STATUS_RUNNING, locked_until__lt=now, attempts__gte=F('max_attempts'))
+     .update(status=AnalysisJob.STATUS_FAILED,
+             last_error='Worker stopped before finishing the job on its last attempt',
+             locked_by='', locked_until=None, updated_at=now))
+
+    runnable = (Q(status=AnalysisJob.STATUS_PENDING, run_after__lte=now) |
+                Q(status=AnalysisJob.STATUS_RUNNING, locked_until__lt=now, attempts__lt=F('max_attempts')))
+    candidates = (AnalysisJob.objects
+                  .filter(runnable)
+                  .order_by('-priority', 'run_after', 'id')
+                  .values_list('id', 'status', 'locked_until')[:10])
+
+    for job_id, status, locked_until in candidates:
+        claimed = (AnalysisJob.objects
+                   .filter(pk=job_id, status=status, locked_until=locked_until)
+                   .update(status=AnalysisJob.STATUS_RUNNING,
+                           locked_by=worker_id,
+                           locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                           attempts=F('attempts') + 1,
+                           updated_at=now))
+        if claimed:
+            return AnalysisJob.objects.get(pk=job_id)
+    return None
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run_job(job, analyzer):
+    """Analyse one claimed job and record its result or schedule a retry"""
+    messages = [MessageRecord.from_dict(data) for data in job.payload['messages']]
+    try:
+        analysis = analyzer.analyze(messages)
+    except Exception as e:
+        error = str(e)
+        if job.attempts >= job.max_attempts:
+            status, run_after = AnalysisJob.STATUS_FAILED, job.run_after
+        else:
+            status, run_after = AnalysisJob.STATUS_PENDING, timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+        AnalysisJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=status, run_after=run_after, last_error=error,
+            locked_by='', locked_until=None, updated_at=timezone.now())
+        print(f"Analysis job {job.pk} failed (attempt {job.attempts}/{job.max_attempts}): {error}")
+        return False
+
+    verdicts = verdicts_by_message_id(messages, analysis)
+    save_verdicts(job.chat_id, messages, verdicts)
+    # The message texts are no longer needed once their verdicts are saved
+    AnalysisJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=AnalysisJob.STATUS_DONE, result=verdicts, payload={'messages': []},
+        last_error='', locked_by='', locked_until=None, updated_at=timezone.now())
+    return True
+
+
+def run_worker(analyzer, poll_interval=1.0, max_jobs=None, stop_event=None):
+    """Process jobs until ``max_jobs`` have run or ``stop_event`` is set.
+
+    Finished jobs older than JOB_RETENTION_SECONDS are pruned every
+    PRUNE_INTERVAL_SECONDS, so the queue table does not grow without bound.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    last_pruned = None
+    while max_jobs is None or processed < max_jobs:
+        if stop_event is not None and stop_event.is_set():
+            break
+        try:
+            if last_pruned is None or time.monotonic() - last_pruned >= PRUNE_INTERVAL_SECONDS:
+                last_pruned = time.monotonic()
+                pruned = prune_finished_jobs()
+                if pruned:
+                    print(f"Analysis worker {worker_id} pruned {pruned} finished jobs")
+            job = claim_next_job(worker_id)
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            run_job(job, analyzer)
+        except DatabaseError as e:
+            # Usually SQLite lock contention; an unfinished job is reclaimed once its lease expires
+            print(f"Analysis worker {worker_id} database error: {e}")
+            connection.close_if_unusable_or_obsolete()
+            time.sleep(poll_interval)
+            continue
+        processed += 1
+    return processed
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.backfill import (BACKFILL_ANALYSIS_CHUNK_SIZE, BACKFILL_PAGE_SIZE, BACKFILL_THROTTLE_SECONDS, BackfillRunning,
+                          run_backfill)
+from api.models import ChatBackfill
+from api.telegram_client import telegram_service
+
+
+class Command(BaseCommand):
+    help = ("Fetch a group's entire history into the local store and queue it for analysis. "
+            "Interrupted runs resume from the last saved page.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('group_id', help='Telegram id of the group')
+        parser.add_argument('--phone', required=True, help='Phone number whose saved session is used')
+        parser.add_argument('--page-size', type=int, default=BACKFILL_PAGE_SIZE, help='Messages per page')
+        parser.add_argument('--throttle', type=float, default=BACKFILL_THROTTLE_SECONDS,
+                            help='Seconds to wait between pages')
+        parser.add_argument('--analysis-chunk-size', type=int, default=BACKFILL_ANALYSIS_CHUNK_SIZE,
+                            help='Messages per queued analysis job')
+        parser.add_argument('--max-pages', type=int, default=None, help='Stop after this many pages')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the newest message')
+
+    def handle(self, *args, **options):
+        session = telegram_service.resume_session(options['phone'])
+        if not session['success']:
+            raise CommandError(f"Could not resume Telegram session: {session['error']}")
+
+        def report(backfill):
+            progress = backfill.progress()
+            percent = f"{progress * 100:.1f}%" if progress is not None else '?'
+            self.stdout.write(
+                f"[{percent}] {backfill.messages_fetched}/{backfill.total_messages or '?'} messages, "
+                f"{backfill.pages_fetched} pages, {backfill.jobs_queued} analysis jobs queued"
+            )
+
+        try:
+            backfill = run_backfill(
+                telegram_service,
+                options['group_id'],
+                page_size=options['page_size'],
+                throttle=options['throttle'],
+                analysis_chunk_size=options['analysis_chunk_size'],
+                max_pages=options['max_pages'],
+                restart=options['restart'],
+                progress=report,
+            )
+        except BackfillRunning as e:
+            raise CommandError(str(e))
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted; run the command again to resume')
+            return
+        finally:
+            telegram_service.disconnect()
+
+        if backfill.status == ChatBackfill.STATUS_FAILED:
+            raise CommandError(f"Backfill failed: {backfill.last_error}")
+        self.stdout.write(self.style.SUCCESS(f"Backfill {backfill.status}: {backfill.messages_stored} messages stored"))
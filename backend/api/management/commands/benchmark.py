@@ -0,0 +1,236 @@
+import contextlib
+import json
+import math
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from api.cache import service_cache
+from api.claims import ClaimIndex
+from api.fakes import FakeGeminiModel, FakeMessage, FakeTelegramClient
+from api.records import iter_result_json
+from api.telegram_client import telegram_service
+
+SCENARIOS = ['send_code', 'verify_code', 'check_auth', 'get_groups', 'get_messages']
+BENCHMARK_PHONE = '+91 0000000000'
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, status_codes, duration):
+    """Build the machine-readable summary for one scenario"""
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    errors = sum(count for status, count in status_codes.items() if status >= 400)
+    return {
+        'requests': len(latencies_ms),
+        'errors': errors,
+        'status_codes': {str(status): count for status, count in sorted(status_codes.items())},
+        'duration_s': round(duration, 4),
+        'throughput_rps': round(len(latencies_ms) / duration, 2) if duration else None,
+        'latency_ms': {
+            'min': round(latencies_ms[0], 3) if latencies_ms else None,
+            'mean': round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else None,
+            'p50': round(percentile(latencies_ms, 50), 3) if latencies_ms else None,
+            'p95': round(percentile(latencies_ms, 95), 3) if latencies_ms else None,
+            'p99': round(percentile(latencies_ms, 99), 3) if latencies_ms else None,
+            'max': round(latencies_ms[-1], 3) if latencies_ms else None,
+        },
+    }
+
+
+def measure_memory(batch_size):
+    """Peak traced memory of formatting, prompt building and serialising one batch of messages.
+
+    The raw fake messages are created before tracing starts, since they stand
+    in for what Telethon has already allocated.
+    """
+    now = datetime.now(timezone.utc)
+    chat_id = '-1000000000'
+    raw_messages = [msg for msg in (FakeMessage(int(chat_id), i, now) for i in range(batch_size, 0, -1)) if msg.text]
+
+    tracemalloc.start()
+    try:
+        records = [telegram_service._format_message(msg, chat_id) for msg in raw_messages]
+        records_bytes = tracemalloc.get_traced_memory()[0]
+        prompt_chars = len(telegram_service.analyzer.create_analysis_prompt(records))
+        response_bytes = sum(len(chunk) for chunk in iter_result_json({'success': True, 'messages': records}))
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'batch_size': batch_size,
+        'text_messages': len(records),
+        'records_bytes': records_bytes,
+        'bytes_per_record': round(records_bytes / len(records), 1) if records else None,
+        'prompt_chars': prompt_chars,
+        'response_bytes': response_bytes,
+        'peak_bytes': peak_bytes,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the API endpoints offline against fake Telegram and Gemini backends '
+            'and report throughput and latency percentiles as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f'Comma separated scenarios to run ({", ".join(SCENARIOS)})')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads')
+        parser.add_argument('--limit', type=int, default=100, help='Message limit for get_messages')
+        parser.add_argument('--dialogs', type=int, default=20, help='Number of fake groups')
+        parser.add_argument('--messages-per-chat', type=int, default=1000, help='Messages in each fake group')
+        parser.add_argument('--telegram-latency', type=float, default=0.01, help='Fake Telegram latency in seconds')
+        parser.add_argument('--telegram-jitter', type=float, default=0.0, help='Extra random Telegram latency in seconds')
+        parser.add_argument('--flood-wait-rate', type=float, default=0.0, help='Fraction of Telegram calls raising FloodWait')
+        parser.add_argument('--gemini-latency', type=float, default=0.05, help='Fake Gemini latency in seconds')
+        parser.add_argument('--gemini-jitter', type=float, default=0.0, help='Extra random Gemini latency in seconds')
+        parser.add_argument('--malformed-rate', type=float, default=0.0, help='Fraction of Gemini replies that are invalid JSON')
+        parser.add_argument('--request-timeout', type=float, default=None,
+                            help='Deadline in seconds sent with get_groups and get_messages requests')
+        parser.add_argument('--cache', choices=['off', 'local'], default='off',
+                            help='Service cache mode; the shared tier is never used so runs stay isolated')
+        parser.add_argument('--memory-batch', type=int, default=0,
+                            help='Also measure peak memory for a batch of this many messages (e.g. 50000)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible runs')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        fake_client_options = {
+            'dialogs': options['dialogs'],
+            'messages_per_chat': options['messages_per_chat'],
+            'latency': options['telegram_latency'],
+            'jitter': options['telegram_jitter'],
+            'flood_wait_rate': options['flood_wait_rate'],
+            'seed': options['seed'],
+        }
+        original_factory = telegram_service.client_factory
+        original_model = telegram_service.analyzer.model
+        original_claim_index = telegram_service.analyzer.claim_index
+        # An in-memory claim index keeps known fake claims out of the database during the run
+        telegram_service.analyzer.claim_index = ClaimIndex(persistent=False)
+        telegram_service.client_factory = lambda *args: FakeTelegramClient(*args, **fake_client_options)
+        telegram_service.analyzer.model = FakeGeminiModel(
+            latency=options['gemini_latency'],
+            jitter=options['gemini_jitter'],
+            malformed_rate=options['malformed_rate'],
+            seed=options['seed'],
+        )
+        telegram_service.client = None
+        original_cache = (service_cache.enabled, service_cache.shared_alias)
+        service_cache.enabled = options['cache'] != 'off'
+        service_cache.shared_alias = None
+        service_cache.local.clear()
+
+        results = {}
+        memory = measure_memory(options['memory_batch']) if options['memory_batch'] else None
+        try:
+            # Sessions are kept in signed cookies so the benchmark never writes to db.sqlite3
+            with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'), \
+                    contextlib.redirect_stdout(sys.stderr):
+                # Authenticate the fake client up front, retrying through any injected FloodWaits
+                for _ in range(10):
+                    if self._request('verify_code', 0) == 200:
+                        break
+                for scenario in scenarios:
+                    results[scenario] = self._run_scenario(scenario, options['requests'], options['concurrency'], options)
+        finally:
+            telegram_service.disconnect()
+            telegram_service.client_factory = original_factory
+            telegram_service.analyzer.model = original_model
+            telegram_service.analyzer.claim_index = original_claim_index
+            service_cache.enabled, service_cache.shared_alias = original_cache
+            service_cache.local.clear()
+
+        report = {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'config': {key: options[key] for key in (
+                'requests', 'concurrency', 'limit', 'dialogs', 'messages_per_chat',
+                'telegram_latency', 'telegram_jitter', 'flood_wait_rate',
+                'gemini_latency', 'gemini_jitter', 'malformed_rate', 'request_timeout', 'cache', 'seed',
+            )},
+            'scenarios': results,
+        }
+        if memory:
+            report['memory'] = memory
+        report_json = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report_json + '\n')
+            for scenario, summary in results.items():
+                latency = summary['latency_ms']
+                self.stdout.write(
+                    f"{scenario:<14} {summary['throughput_rps']:>9} req/s  "
+                    f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms "
+                    f"errors={summary['errors']}"
+                )
+            if memory:
+                self.stdout.write(
+                    f"memory         {memory['text_messages']} messages  "
+                    f"records={memory['records_bytes'] / 1e6:.1f}MB ({memory['bytes_per_record']} B/message) "
+                    f"peak={memory['peak_bytes'] / 1e6:.1f}MB"
+                )
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(report_json)
+
+    def _run_scenario(self, scenario, total_requests, concurrency, options):
+        """Fire ``total_requests`` requests for one scenario and collect timings"""
+        def timed(i):
+            start = time.perf_counter()
+            status = self._request(scenario, i, options)
+            return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(timed, range(total_requests)))
+        duration = time.perf_counter() - start
+
+        return summarize(
+            [latency for latency, _ in outcomes],
+            Counter(status for _, status in outcomes),
+            duration,
+        )
+
+    def _request(self, scenario, i, options=None):
+        """Issue a single request for a scenario, read its whole body and return the HTTP status code"""
+        client = Client(HTTP_HOST='localhost')
+        params = {}
+        if options and options['request_timeout'] is not None:
+            params['timeout'] = options['request_timeout']
+        if scenario == 'send_code':
+            response = client.post('/api/auth/send-code/', json.dumps({'phone_number': BENCHMARK_PHONE}),
+                                   content_type='application/json')
+        elif scenario == 'verify_code':
+            response = client.post('/api/auth/verify-code/', json.dumps({'phone_number': BENCHMARK_PHONE, 'code': '12345'}),
+                                   content_type='application/json')
+        elif scenario == 'check_auth':
+            response = client.get('/api/auth/check/')
+        elif scenario == 'get_groups':
+            response = client.get('/api/groups/', params)
+        else:
+            group_id = -(1000000000 + i % options['dialogs'])
+            response = client.get(f'/api/groups/{group_id}/messages/', {'limit': options['limit'], **params})
+        if response.streaming:
+            # Streamed bodies are only serialised while being read, so read them inside the timing
+            b''.join(response.streaming_content)
+        return response.status_code
@@ -0,0 +1,54 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.analysis import MessageAnalyzer
+from api.jobs import run_worker
+
+
+def _worker_main(poll_interval, max_jobs):
+    # Let the parent decide when to stop; children exit when it terminates them
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(MessageAnalyzer(), poll_interval=poll_interval, max_jobs=max_jobs)
+
+
+class Command(BaseCommand):
+    help = 'Run worker processes that take analysis jobs from the queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after each worker has run this many jobs')
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            self.stdout.write('Analysis worker started')
+            try:
+                processed = run_worker(MessageAnalyzer(), poll_interval=options['poll_interval'],
+                                       max_jobs=options['max_jobs'])
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
+            return
+
+        # Database connections must not be shared with forked children
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_worker_main, args=(options['poll_interval'], options['max_jobs']), daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} analysis workers")
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
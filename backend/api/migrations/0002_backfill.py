@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_analysisjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatBackfill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('paused', 'Paused'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('offset_id', models.BigIntegerField(default=0)),
+                ('total_messages', models.BigIntegerField(blank=True, null=True)),
+                ('messages_fetched', models.BigIntegerField(default=0)),
+                ('messages_stored', models.BigIntegerField(default=0)),
+                ('pages_fetched', models.PositiveIntegerField(default=0)),
+                ('jobs_queued', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StoredMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=64)),
+                ('message_id', models.BigIntegerField()),
+                ('sender_id', models.CharField(max_length=64)),
+                ('sender_name', models.CharField(max_length=255)),
+                ('content', models.TextField()),
+                ('timestamp', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('chat_id', 'message_id'), name='unique_stored_message')],
+            },
+        ),
+    ]
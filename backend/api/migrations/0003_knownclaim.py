@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_backfill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnownClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField()),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('signature', models.JSONField()),
+                ('chat_id', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_knownclaim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatbackfill',
+            name='pause_requested',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_chatbackfill_pause_requested'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageVerdict',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=64)),
+                ('message_id', models.BigIntegerField()),
+                ('content_hash', models.CharField(max_length=64)),
+                ('verdict', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('chat_id', 'message_id'), name='unique_message_verdict')],
+            },
+        ),
+    ]
@@ -1,3 +1,154 @@
 from django.db import models
+from django.db.models import Q
 
-# Create your models here.
+
+class AnalysisJob(models.Model):
+    """A durable request to run AI analysis over a range of messages from one chat"""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    # Higher priorities are claimed first
+    PRIORITY_BACKFILL = 0
+    PRIORITY_INTERACTIVE = 10
+
+    chat_id = models.CharField(max_length=64)
+    first_message_id = models.BigIntegerField()
+    last_message_id = models.BigIntegerField()
+    dedup_key = models.CharField(max_length=64)
+    priority = models.IntegerField(default=PRIORITY_BACKFILL)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    payload = models.JSONField()
+    result = models.JSONField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=128, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_after'], name='analysis_job_claim_idx'),
+            models.Index(fields=['dedup_key', 'status'], name='analysis_job_dedup_idx'),
+        ]
+        constraints = [
+            # Only one pending or running job may exist for identical work
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=Q(status__in=['pending', 'running']),
+                name='unique_active_analysis_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"AnalysisJob {self.pk} chat={self.chat_id} [{self.first_message_id}-{self.last_message_id}] {self.status}"
+
+
+class StoredMessage(models.Model):
+    """A text message saved locally by a history backfill"""
+
+    chat_id = models.CharField(max_length=64)
+    message_id = models.BigIntegerField()
+    sender_id = models.CharField(max_length=64)
+    sender_name = models.CharField(max_length=255)
+    content = models.TextField()
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chat_id', 'message_id'], name='unique_stored_message'),
+        ]
+
+    def __str__(self):
+        return f"StoredMessage {self.chat_id}/{self.message_id}"
+
+
+class ChatBackfill(models.Model):
+    """Checkpoint and progress of a whole-history backfill for one chat"""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_PAUSED = 'paused'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_PAUSED, 'Paused'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    chat_id = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # Id of the oldest message fetched so far; the next page starts below it
+    offset_id = models.BigIntegerField(default=0)
+    total_messages = models.BigIntegerField(null=True, blank=True)
+    messages_fetched = models.BigIntegerField(default=0)
+    messages_stored = models.BigIntegerField(default=0)
+    pages_fetched = models.PositiveIntegerField(default=0)
+    jobs_queued = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Set by any process to ask the running backfill to stop after its current page
+    pause_requested = models.BooleanField(default=False)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Saved after every page, so a stale value means the process running the backfill died
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def progress(self):
+        """Fraction of the chat fetched so far, or None while the size is unknown"""
+        if self.status == self.STATUS_DONE:
+            return 1.0
+        if not self.total_messages:
+            return None
+        return min(1.0, self.messages_fetched / self.total_messages)
+
+    def __str__(self):
+        return f"ChatBackfill {self.chat_id} {self.status} {self.messages_fetched}/{self.total_messages}"
+
+
+class KnownClaim(models.Model):
+    """A message previously judged to be fake news, kept for near-duplicate lookup"""
+
+    content = models.TextField()
+    # Hash of the normalised text, so the same claim is only stored once
+    content_hash = models.CharField(max_length=64, unique=True)
+    # MinHash signature of the claim's word n-grams
+    signature = models.JSONField()
+    chat_id = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"KnownClaim {self.pk}: {self.content[:50]}"
+
+
+class MessageVerdict(models.Model):
+    """The latest AI verdict for one message, reused by later analysis requests covering it"""
+
+    chat_id = models.CharField(max_length=64)
+    message_id = models.BigIntegerField()
+    # Hash of the analysed text, so an edited message is analysed again
+    content_hash = models.CharField(max_length=64)
+    verdict = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chat_id', 'message_id'], name='unique_message_verdict'),
+        ]
+
+    def __str__(self):
+        return f"MessageVerdict {self.chat_id}/{self.message_id}"
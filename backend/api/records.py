@@ -0,0 +1,113 @@
+import json
+import sys
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class MessageRecord:
+    """Compact in-flight form of a chat message.
+
+    One slotted record per message is shared by formatting, prompt building,
+    analysis and response serialisation, instead of building a fresh dict at
+    each step. Sender ids and names repeat across a chat, so they are interned.
+    """
+
+    __slots__ = ('id', 'chat_id', 'sender_id', 'sender_name', 'content', 'timestamp',
+                 'is_important', 'has_event', 'event_details', 'is_fake_news')
+
+    def __init__(self, id, chat_id, sender_id, sender_name, content, timestamp,
+                 is_important=False, has_event=False, event_details=None, is_fake_news=False):
+        self.id = id
+        self.chat_id = chat_id
+        self.sender_id = sys.intern(sender_id)
+        self.sender_name = sys.intern(sender_name)
+        self.content = content
+        self.timestamp = timestamp
+        self.is_important = is_important
+        self.has_event = has_event
+        self.event_details = event_details
+        self.is_fake_news = is_fake_news
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from the API message format (as stored in job payloads)"""
+        return cls(
+            id=data['id'],
+            chat_id=data.get('chatId', ''),
+            sender_id=data.get('senderId', 'unknown'),
+            sender_name=data.get('senderName', 'Unknown'),
+            content=data['content'],
+            timestamp=data.get('timestamp', ''),
+        )
+
+    def apply_verdict(self, verdict):
+        self.is_important = verdict.get('isImportant', False)
+        self.is_fake_news = verdict.get('isFakeNews', False)
+        self.has_event = verdict.get('hasEvent', False)
+        self.event_details = verdict.get('eventDetails') if self.has_event else None
+
+    def to_dict(self):
+        """The message in the API response format"""
+        return {
+            'id': self.id,
+            'chatId': self.chat_id,
+            'senderId': self.sender_id,
+            'senderName': self.sender_name,
+            'content': self.content,
+            'timestamp': self.timestamp,
+            'isImportant': self.is_important,
+            'hasEvent': self.has_event,
+            'eventDetails': self.event_details,
+            'isFakeNews': self.is_fake_news
+        }
+
+    def to_payload(self):
+        """The fields analysis needs, for storing in a job payload"""
+        return {
+            'id': self.id,
+            'chatId': self.chat_id,
+            'senderId': self.sender_id,
+            'senderName': self.sender_name,
+            'content': self.content,
+            'timestamp': self.timestamp,
+        }
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"MessageRecord(id={self.id!r}, chat_id={self.chat_id!r}, sender_name={self.sender_name!r})"
+
+
+def iter_result_json(result, chunk_size=65536):
+    """Serialise a service result holding MessageRecords as JSON chunks.
+
+    Messages are encoded one at a time and sent in chunks of roughly
+    ``chunk_size`` characters, so the full response body is never held in
+    memory alongside the records.
+    """
+    buffer = ['{"messages": [']
+    buffered = 0
+    for i, record in enumerate(result.get('messages', ())):
+        part = (',' if i else '') + json.dumps(record.to_dict(), cls=DjangoJSONEncoder)
+        buffer.append(part)
+        buffered += len(part)
+        if buffered >= chunk_size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    buffer.append(']')
+    for key, value in result.items():
+        if key != 'messages':
+            buffer.append(f', {json.dumps(key)}: {json.dumps(value, cls=DjangoJSONEncoder)}')
+    buffer.append('}')
+    yield ''.join(buffer)
+
+
+async def aiter_result_json(result, chunk_size=65536):
+    """Async form of ``iter_result_json`` for ASGI servers, which only stream async iterators"""
+    for chunk in iter_result_json(result, chunk_size):
+        yield chunk
@@ -1,3 +1,593 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .analysis import MessageAnalyzer
+from .backfill import BackfillRunning, claim_backfill, pause_backfill, run_backfill, start_backfill_thread
+from .cache import MISSING, TieredCache, service_cache
+from .claims import ClaimIndex
+from .deadline import Deadline, DeadlineExceeded
+from .fakes import SAMPLE_TEXTS, FakeGeminiModel, FakeTelegramClient
+from .jobs import claim_next_job, enqueue_analysis, prune_finished_jobs, run_job, stored_verdicts
+from .models import AnalysisJob, ChatBackfill, KnownClaim, StoredMessage
+from .records import MessageRecord
+from .telegram_client import ANALYSIS_INLINE_TIMEOUT_SECONDS, TelegramService, telegram_service
+from .views import _close_connections_after
+
+CHAT_ID = '-1000000000'
+FAKE_CLAIM = "Drinking hot water every morning cures every virus, doctors at AIIMS confirmed it today"
+
+
+def make_messages(count, chat_id=CHAT_ID, first_id=1):
+    now = timezone.now().isoformat()
+    return [
+        MessageRecord(str(i), chat_id, '1001', 'Asha Verma', SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)], now)
+        for i in range(first_id, first_id + count)
+    ]
+
+
+def make_analyzer(**model_options):
+    return MessageAnalyzer(model=FakeGeminiModel(**model_options), claim_index=ClaimIndex(persistent=False))
+
+
+def make_service(**client_options):
+    """A TelegramService signed in to a fake Telegram account"""
+    service = TelegramService(client_factory=lambda *args: FakeTelegramClient(*args, **client_options))
+    service.analyzer = make_analyzer()
+    service.verify_code('+91 0000000000', '12345')
+    return service
+
+
+class JobQueueTests(TestCase):
+    def test_identical_work_is_queued_once(self):
+        first = enqueue_analysis(CHAT_ID, make_messages(5))
+        second = enqueue_analysis(CHAT_ID, make_messages(5))
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+
+    def test_different_messages_are_queued_separately(self):
+        enqueue_analysis(CHAT_ID, make_messages(5))
+        enqueue_analysis(CHAT_ID, make_messages(5, first_id=6))
+
+        self.assertEqual(AnalysisJob.objects.count(), 2)
+
+    def test_interactive_request_raises_priority_of_queued_job(self):
+        job = enqueue_analysis(CHAT_ID, make_messages(5), priority=AnalysisJob.PRIORITY_BACKFILL)
+        enqueue_analysis(CHAT_ID, make_messages(5), priority=AnalysisJob.PRIORITY_INTERACTIVE)
+
+        job.refresh_from_db()
+        self.assertEqual(job.priority, AnalysisJob.PRIORITY_INTERACTIVE)
+
+    def test_higher_priority_is_claimed_first(self):
+        enqueue_analysis(CHAT_ID, make_messages(5), priority=AnalysisJob.PRIORITY_BACKFILL)
+        interactive = enqueue_analysis(CHAT_ID, make_messages(5, first_id=6), priority=AnalysisJob.PRIORITY_INTERACTIVE)
+
+        self.assertEqual(claim_next_job('worker').pk, interactive.pk)
+
+    def test_successful_job_stores_verdicts(self):
+        messages = make_messages(10)
+        job = enqueue_analysis(CHAT_ID, messages)
+
+        self.assertTrue(run_job(claim_next_job('worker'), make_analyzer()))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.STATUS_DONE)
+        self.assertEqual(set(job.result), {msg.id for msg in messages})
+        self.assertEqual(job.payload, {'messages': []})
+        self.assertEqual(set(stored_verdicts(CHAT_ID, messages)), {msg.id for msg in messages})
+
+    def test_only_messages_without_verdicts_are_queued(self):
+        enqueue_analysis(CHAT_ID, make_messages(10))
+        # Fake verdicts must reach KnownClaim, or the claim index clears them again
+        run_job(claim_next_job('worker'), MessageAnalyzer(model=FakeGeminiModel(), claim_index=ClaimIndex()))
+
+        result = telegram_service._queue_analysis(CHAT_ID, make_messages(11))
+
+        job = AnalysisJob.objects.get(pk=result['analysisJobId'])
+        self.assertEqual([msg['id'] for msg in job.payload['messages']], ['11'])
+        self.assertTrue(any(msg.is_fake_news for msg in result['messages'][:10]))
+
+    def test_fully_analysed_messages_need_no_job(self):
+        enqueue_analysis(CHAT_ID, make_messages(10))
+        run_job(claim_next_job('worker'), make_analyzer())
+
+        result = telegram_service._queue_analysis(CHAT_ID, make_messages(10))
+
+        self.assertEqual(result['analysisStatus'], AnalysisJob.STATUS_DONE)
+        self.assertIsNone(result['analysisJobId'])
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+
+    def test_edited_message_is_analysed_again(self):
+        messages = make_messages(3)
+        enqueue_analysis(CHAT_ID, messages)
+        run_job(claim_next_job('worker'), make_analyzer())
+
+        messages[0].content = 'Edited: meeting moved to Saturday'
+
+        self.assertEqual(set(stored_verdicts(CHAT_ID, messages)), {'2', '3'})
+
+    def test_old_finished_jobs_are_pruned(self):
+        done = enqueue_analysis(CHAT_ID, make_messages(5))
+        pending = enqueue_analysis(CHAT_ID, make_messages(5, first_id=6))
+        AnalysisJob.objects.filter(pk=done.pk).update(status=AnalysisJob.STATUS_DONE)
+        AnalysisJob.objects.update(updated_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(prune_finished_jobs(retention_seconds=86400), 1)
+        self.assertEqual(list(AnalysisJob.objects.values_list('pk', flat=True)), [pending.pk])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = enqueue_analysis(CHAT_ID, make_messages(5))
+
+        self.assertFalse(run_job(claim_next_job('worker'), make_analyzer(malformed_rate=1.0)))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.STATUS_PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('JSON', job.last_error)
+        self.assertIsNone(claim_next_job('worker'))
+
+    def test_job_fails_after_max_attempts(self):
+        job = enqueue_analysis(CHAT_ID, make_messages(5))
+        AnalysisJob.objects.filter(pk=job.pk).update(max_attempts=1)
+
+        run_job(claim_next_job('worker'), make_analyzer(malformed_rate=1.0))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.STATUS_FAILED)
+
+    def test_expired_lease_is_reclaimed(self):
+        job = enqueue_analysis(CHAT_ID, make_messages(5))
+        claim_next_job('dead-worker')
+        AnalysisJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        reclaimed = claim_next_job('worker')
+
+        self.assertEqual(reclaimed.pk, job.pk)
+        self.assertEqual(reclaimed.locked_by, 'worker')
+        self.assertEqual(reclaimed.attempts, 2)
+
+    def test_expired_lease_on_last_attempt_fails_job(self):
+        job = enqueue_analysis(CHAT_ID, make_messages(5))
+        claim_next_job('dead-worker')
+        AnalysisJob.objects.filter(pk=job.pk).update(
+            attempts=job.max_attempts, locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertIsNone(claim_next_job('worker'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.STATUS_FAILED)
+
+
+class BackfillTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Message ids 1-50, of which 13, 26 and 39 are media-only
+        cls.service = make_service(messages_per_chat=50)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.disconnect()
+        super().tearDownClass()
+
+    def test_resumes_from_checkpoint_after_max_pages(self):
+        backfill = run_backfill(self.service, CHAT_ID, page_size=10, throttle=0, max_pages=2)
+
+        self.assertEqual(backfill.status, ChatBackfill.STATUS_PAUSED)
+        self.assertEqual(backfill.pages_fetched, 2)
+        self.assertEqual(backfill.offset_id, 31)
+        self.assertEqual(backfill.total_messages, 50)
+
+        backfill = run_backfill(self.service, CHAT_ID, page_size=10, throttle=0)
+
+        self.assertEqual(backfill.status, ChatBackfill.STATUS_DONE)
+        self.assertEqual(backfill.messages_fetched, 50)
+        self.assertEqual(backfill.messages_stored, 47)
+        self.assertEqual(StoredMessage.objects.filter(chat_id=CHAT_ID).count(), 47)
+        self.assertEqual(backfill.progress(), 1.0)
+        self.assertTrue(AnalysisJob.objects.filter(chat_id=CHAT_ID, priority=AnalysisJob.PRIORITY_BACKFILL).exists())
+
+    def test_finished_backfill_is_not_run_again_unless_restarted(self):
+        run_backfill(self.service, CHAT_ID, page_size=25, throttle=0)
+
+        backfill = run_backfill(self.service, CHAT_ID, page_size=25, throttle=0)
+        self.assertEqual(backfill.status, ChatBackfill.STATUS_DONE)
+        self.assertEqual(backfill.pages_fetched, 2)
+
+        backfill = run_backfill(self.service, CHAT_ID, page_size=25, throttle=0, max_pages=1, restart=True)
+        self.assertEqual(backfill.pages_fetched, 1)
+        self.assertEqual(StoredMessage.objects.filter(chat_id=CHAT_ID).count(), 47)
+
+    def test_running_backfill_cannot_be_started_again(self):
+        claim_backfill(CHAT_ID)
+
+        with self.assertRaises(BackfillRunning):
+            run_backfill(self.service, CHAT_ID, throttle=0)
+        self.assertFalse(start_backfill_thread(self.service, CHAT_ID))
+
+    def test_abandoned_backfill_can_be_taken_over(self):
+        claim_backfill(CHAT_ID)
+        ChatBackfill.objects.filter(chat_id=CHAT_ID).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        backfill = run_backfill(self.service, CHAT_ID, page_size=10, throttle=0, max_pages=1)
+
+        self.assertEqual(backfill.pages_fetched, 1)
+
+    def test_pause_request_stops_after_current_page(self):
+        backfill = run_backfill(self.service, CHAT_ID, page_size=10, throttle=0,
+                                progress=lambda backfill: pause_backfill(CHAT_ID))
+
+        self.assertEqual(backfill.status, ChatBackfill.STATUS_PAUSED)
+        self.assertEqual(backfill.pages_fetched, 1)
+        self.assertFalse(ChatBackfill.objects.get(chat_id=CHAT_ID).pause_requested)
+        self.assertFalse(pause_backfill(CHAT_ID))
+
+    def test_messages_with_verdicts_are_not_queued_again(self):
+        run_backfill(self.service, CHAT_ID, page_size=50, throttle=0, analysis_chunk_size=50)
+        run_job(claim_next_job('worker'), make_analyzer())
+
+        backfill = run_backfill(self.service, CHAT_ID, page_size=50, throttle=0, restart=True)
+
+        self.assertEqual(backfill.status, ChatBackfill.STATUS_DONE)
+        self.assertEqual(backfill.jobs_queued, 0)
+
+
+class RecordingGeminiModel(FakeGeminiModel):
+    """Fake Gemini model that keeps the options of every request"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.requests.append(kwargs)
+        return super().generate_content(prompt, **kwargs)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+class DeadlineTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.original = (telegram_service.client_factory, telegram_service.analyzer, service_cache.enabled)
+        telegram_service.client_factory = lambda *args: FakeTelegramClient(*args, messages_per_chat=100)
+        telegram_service.analyzer = make_analyzer()
+        telegram_service.client = None
+        service_cache.enabled = False
+        telegram_service.verify_code('+91 0000000000', '12345')
+
+    @classmethod
+    def tearDownClass(cls):
+        telegram_service.disconnect()
+        telegram_service.client_factory, telegram_service.analyzer, service_cache.enabled = cls.original
+        super().tearDownClass()
+
+    def tearDown(self):
+        telegram_service.client.latency = 0.0
+        telegram_service.analyzer.model = FakeGeminiModel()
+
+    def get_messages(self, **params):
+        response = Client().get(f'/api/groups/{CHAT_ID}/messages/', {'limit': 50, **params})
+        if response.streaming:
+            return response.status_code, json.loads(b''.join(response.streaming_content))
+        return response.status_code, response.json()
+
+    def test_asgi_response_is_streamed_asynchronously(self):
+        async def fetch():
+            response = await AsyncClient().get(f'/api/groups/{CHAT_ID}/messages/', {'limit': 50})
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+
+        response, body = asyncio.run(fetch())
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(len(json.loads(body)['messages']), 46)
+
+    def test_messages_are_analysed_when_there_is_time(self):
+        status, data = self.get_messages()
+
+        self.assertEqual(status, 200)
+        self.assertNotIn('analysisSkipped', data)
+        self.assertTrue(any(msg['isFakeNews'] for msg in data['messages']))
+
+    def test_short_deadline_skips_analysis(self):
+        status, data = self.get_messages(timeout=1)
+
+        self.assertEqual(status, 200)
+        self.assertTrue(data['analysisSkipped'])
+        self.assertFalse(any(msg['isFakeNews'] for msg in data['messages']))
+
+    def test_expired_deadline_returns_504(self):
+        telegram_service.client.latency = 1.0
+
+        start = time.monotonic()
+        status, data = self.get_messages(timeout=0.1)
+
+        self.assertEqual(status, 504)
+        self.assertEqual(data['error'], 'Request timed out')
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_cancelled_deadline_stops_service_call(self):
+        telegram_service.client.latency = 1.0
+        deadline = Deadline(5)
+        threading.Timer(0.1, deadline.cancel).start()
+
+        with self.assertRaisesMessage(DeadlineExceeded, 'Request cancelled'):
+            telegram_service.get_groups(deadline=deadline)
+
+    def test_inline_gemini_request_timeout_is_capped(self):
+        telegram_service.analyzer.model = RecordingGeminiModel()
+
+        self.assertTrue(telegram_service._analyze_messages_with_ai(make_messages(3), deadline=Deadline(60)))
+        self.assertEqual(telegram_service.analyzer.model.requests[0]['request_options']['timeout'],
+                         ANALYSIS_INLINE_TIMEOUT_SECONDS)
+
+    def test_cancelled_deadline_does_not_start_analysis(self):
+        telegram_service.analyzer.model = RecordingGeminiModel()
+        deadline = Deadline(60)
+        deadline.cancel()
+
+        self.assertFalse(telegram_service._analyze_messages_with_ai(make_messages(3), deadline=deadline))
+        self.assertEqual(telegram_service.analyzer.model.requests, [])
+
+    def test_executor_thread_connections_are_closed(self):
+        def failing_call():
+            raise RuntimeError('boom')
+
+        with mock.patch('api.views.close_old_connections') as close_old_connections:
+            with self.assertRaises(RuntimeError):
+                _close_connections_after(failing_call)()
+            self.assertEqual(_close_connections_after(lambda: 'result')(), 'result')
+
+        self.assertEqual(close_old_connections.call_count, 2)
+
+
+class CountingTelegramClient(FakeTelegramClient):
+    fetches = 0
+
+    async def get_messages(self, entity, limit=100, offset_id=0):
+        type(self).fetches += 1
+        return await super().get_messages(entity, limit=limit, offset_id=offset_id)
+
+
+class CoalescingTests(SimpleTestCase):
+    def run_concurrently(self, count, func):
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def run(i):
+            barrier.wait()
+            results[i] = func(i)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def slow_counter(self, calls, value='value'):
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return value
+        return compute
+
+    def test_concurrent_identical_calls_compute_once(self):
+        cache = TieredCache()
+        calls = []
+
+        results = self.run_concurrently(8, lambda i: cache.get_or_compute('key', self.slow_counter(calls), 60))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+
+    def test_calls_from_separate_processes_compute_once(self):
+        # Two caches with their own in-process tiers stand in for two server processes
+        caches['default'].clear()
+        processes = [TieredCache(shared_alias='default', poll_interval=0.01) for _ in range(2)]
+        calls = []
+
+        results = self.run_concurrently(
+            8, lambda i: processes[i % 2].get_or_compute('shared-key', self.slow_counter(calls), 60))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+        caches['default'].clear()
+
+    def test_uncacheable_results_are_recomputed(self):
+        cache = TieredCache()
+        calls = []
+
+        for _ in range(2):
+            cache.get_or_compute('key', self.slow_counter(calls, {'success': False}), 60,
+                                 cache_if=lambda result: result['success'])
+
+        self.assertEqual(len(calls), 2)
+
+    def test_waiting_caller_takes_over_when_leader_runs_out_of_time(self):
+        cache = TieredCache()
+
+        def leader_compute():
+            time.sleep(0.2)
+            raise DeadlineExceeded('Request timed out')
+
+        def lead():
+            with self.assertRaises(DeadlineExceeded):
+                cache.get_or_compute('key', leader_compute, 60, deadline=Deadline(0.1))
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        time.sleep(0.05)
+        value = cache.get_or_compute('key', lambda: 'value', 60, deadline=Deadline(5))
+        leader.join()
+
+        self.assertEqual(value, 'value')
+
+    def test_concurrent_message_requests_fetch_once(self):
+        service = TelegramService(client_factory=CountingTelegramClient)
+        service.analyzer = make_analyzer(latency=0.1)
+        service.verify_code('+91 0000000000', '12345')
+        original = (service_cache.enabled, service_cache.shared_alias)
+        service_cache.enabled, service_cache.shared_alias = True, None
+        service_cache.local.clear()
+        CountingTelegramClient.fetches = 0
+        try:
+            results = self.run_concurrently(6, lambda i: service.get_messages(CHAT_ID, limit=20))
+        finally:
+            service.disconnect()
+            service_cache.enabled, service_cache.shared_alias = original
+            service_cache.local.clear()
+
+        self.assertEqual(CountingTelegramClient.fetches, 1)
+        self.assertTrue(all(result['success'] for result in results))
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+class LogoutTests(SimpleTestCase):
+    phone_number = '+91 0000000000'
+
+    def setUp(self):
+        self.original = (telegram_service.client_factory, telegram_service.analyzer,
+                         service_cache.enabled, service_cache.shared_alias)
+        telegram_service.client_factory = lambda *args: FakeTelegramClient(*args, messages_per_chat=100)
+        telegram_service.analyzer = make_analyzer()
+        telegram_service.client = None
+        # The default locmem cache stands in for the shared tier
+        service_cache.enabled, service_cache.shared_alias = True, 'default'
+        service_cache.local.clear()
+        caches['default'].clear()
+        self.client = Client()
+        self.client.post('/api/auth/verify-code/', {'phone_number': self.phone_number, 'code': '12345'},
+                         content_type='application/json')
+
+    def tearDown(self):
+        telegram_service.disconnect()
+        (telegram_service.client_factory, telegram_service.analyzer,
+         service_cache.enabled, service_cache.shared_alias) = self.original
+        service_cache.local.clear()
+        caches['default'].clear()
+
+    def test_cached_data_is_not_served_after_logout(self):
+        groups = self.client.get('/api/groups/')
+        messages = self.client.get(f'/api/groups/{CHAT_ID}/messages/', {'limit': 20})
+        b''.join(messages.streaming_content)
+        self.assertEqual(len(groups.json()['groups']), 20)
+        self.assertIsNotNone(caches['default'].get(f'groups:{self.phone_number}'))
+
+        self.client.post('/api/auth/logout/')
+
+        self.assertIsNone(telegram_service.phone_number)
+        self.assertIsNone(caches['default'].get(f'groups:{self.phone_number}'))
+        self.assertIsNone(caches['default'].get(f'messages:{self.phone_number}:{CHAT_ID}:20'))
+        self.assertIs(service_cache.get(f'groups:{self.phone_number}'), MISSING)
+
+        groups = self.client.get('/api/groups/')
+        messages = self.client.get(f'/api/groups/{CHAT_ID}/messages/', {'limit': 20})
+        self.assertEqual(groups.status_code, 400)
+        self.assertFalse(groups.json()['success'])
+        self.assertEqual(messages.status_code, 400)
+        self.assertFalse(self.client.get('/api/auth/check/').json()['is_authenticated'])
+
+    def test_signed_out_client_gets_no_cached_data(self):
+        self.client.get('/api/groups/')
+        telegram_service.client._authorized = False
+
+        response = self.client.get('/api/groups/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Not authenticated')
+
+
+class ClaimIndexTests(TestCase):
+    def test_exact_repeat_matches_despite_case_and_punctuation(self):
+        index = ClaimIndex(persistent=False)
+        index.add(FAKE_CLAIM)
+        self.assertIsNotNone(index.lookup(FAKE_CLAIM.upper() + "!!!"))
+
+    def test_near_duplicate_matches(self):
+        index = ClaimIndex(persistent=False)
+        index.add(FAKE_CLAIM)
+        self.assertIsNotNone(index.lookup(FAKE_CLAIM + " please forward"))
+
+    def test_unrelated_message_does_not_match(self):
+        index = ClaimIndex(persistent=False)
+        index.add(FAKE_CLAIM)
+        self.assertIsNone(index.lookup("Water supply will be shut down tomorrow from 9 AM for maintenance"))
+
+    def test_short_messages_are_ignored(self):
+        index = ClaimIndex(persistent=False)
+        index.add("cures every virus")
+        self.assertEqual(len(index), 0)
+
+    def test_known_claims_skip_the_model(self):
+        analyzer = make_analyzer()
+        analyzer.claim_index.add(FAKE_CLAIM)
+        analyzer.model = None
+
+        analysis = analyzer.analyze([MessageRecord('1', CHAT_ID, '1001', 'Asha Verma', FAKE_CLAIM, '')])
+
+        self.assertEqual(analysis, [{'index': 0, 'isImportant': False, 'isFakeNews': True, 'hasEvent': False}])
+
+    def test_claims_added_elsewhere_are_loaded(self):
+        ClaimIndex().add(FAKE_CLAIM, chat_id='-100')
+        index = ClaimIndex()
+        self.assertEqual(index.lookup(FAKE_CLAIM), KnownClaim.objects.get().pk)
+
+    def test_deleted_claim_stops_matching(self):
+        index = ClaimIndex()
+        index.add(FAKE_CLAIM)
+        self.assertIsNotNone(index.lookup(FAKE_CLAIM))
+
+        KnownClaim.objects.all().delete()
+        index.refresh(force=True)
+
+        self.assertIsNone(index.lookup(FAKE_CLAIM))
+        self.assertIsNone(index.lookup(FAKE_CLAIM + " please forward"))
+        self.assertEqual(len(index), 0)
+
+    def test_claim_stored_again_after_deletion_uses_new_id(self):
+        index = ClaimIndex()
+        index.add(FAKE_CLAIM)
+        KnownClaim.objects.all().delete()
+        ClaimIndex().add(FAKE_CLAIM)
+        index.refresh(force=True)
+
+        self.assertEqual(index.lookup(FAKE_CLAIM), KnownClaim.objects.get().pk)
+
+    def test_deleted_claim_clears_cached_fake_verdict(self):
+        analyzer = make_analyzer()
+        analyzer.claim_index = ClaimIndex()
+        analyzer.claim_index.add(FAKE_CLAIM)
+        message = MessageRecord('1', CHAT_ID, '1001', 'Asha Verma', FAKE_CLAIM, '')
+        message.is_fake_news = True
+
+        KnownClaim.objects.all().delete()
+        analyzer.apply_known_claims([message])
+
+        self.assertFalse(message.is_fake_news)
+
+    def test_claim_added_later_flags_cached_verdict(self):
+        analyzer = make_analyzer()
+        message = MessageRecord('1', CHAT_ID, '1001', 'Asha Verma', FAKE_CLAIM + " please forward", '')
+        analyzer.claim_index.add(FAKE_CLAIM)
+
+        analyzer.apply_known_claims([message])
+
+        self.assertTrue(message.is_fake_news)
+
+    def test_short_messages_keep_their_verdict(self):
+        analyzer = make_analyzer()
+        message = MessageRecord('1', CHAT_ID, '1001', 'Asha Verma', "cures every virus", '')
+        message.is_fake_news = True
+
+        analyzer.apply_known_claims([message])
+
+        self.assertTrue(message.is_fake_news)
@@ -8,4 +8,6 @@ urlpatterns = [
     path('auth/logout/', views.logout, name='logout'),
     path('groups/', views.get_groups, name='get_groups'),
     path('groups/<str:group_id>/messages/', views.get_messages, name='get_messages'),
+    path('groups/<str:group_id>/backfill/', views.group_backfill, name='group_backfill'),
+    path('analysis/jobs/<int:job_id>/', views.get_analysis_job, name='get_analysis_job'),
 ]
@@ -1,9 +1,57 @@
+import asyncio
 import json
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from .backfill import backfill_status, pause_backfill, start_backfill_thread
+from .deadline import Deadline, DeadlineExceeded
+from .models import AnalysisJob, ChatBackfill
+from .records import aiter_result_json, iter_result_json
 from .telegram_client import telegram_service
 
+
+def _request_deadline(request):
+    """Deadline for a request; clients may ask for less time than the server maximum via ?timeout="""
+    max_timeout = getattr(settings, 'REQUEST_TIMEOUT_SECONDS', 30)
+    try:
+        timeout = float(request.GET.get('timeout', max_timeout))
+    except ValueError:
+        timeout = max_timeout
+    return Deadline(min(max(timeout, 0.0), max_timeout))
+
+
+def _close_connections_after(func):
+    """Wrap a call made in an executor thread so the database connections it opened are closed"""
+    def call(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Django only closes the request thread's connections at the end of a request
+            close_old_connections()
+    return call
+
+
+async def _call_with_deadline(func, *args, deadline, **kwargs):
+    """Run a blocking service call off the event loop, cancelling its work if the client disconnects"""
+    try:
+        return await sync_to_async(_close_connections_after(func), thread_sensitive=False)(
+            *args, deadline=deadline, **kwargs)
+    except asyncio.CancelledError:
+        deadline.cancel()
+        raise
+
+
+def _deadline_exceeded_response(e):
+    return JsonResponse({
+        'success': False,
+        'error': str(e)
+    }, status=504)
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def send_verification_code(request):
@@ -18,13 +66,16 @@ def send_verification_code(request):
                 'error': 'Phone number is required'
             }, status=400)
 
-        result = telegram_service.send_code_request(phone_number)
+        result = telegram_service.send_code_request(phone_number, deadline=_request_deadline(request))
 
         if result['success']:
             return JsonResponse(result)
         else:
             return JsonResponse(result, status=400)
 
+    except DeadlineExceeded as e:
+        return _deadline_exceeded_response(e)
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -46,7 +97,7 @@ def verify_code(request):
                 'error': 'Phone number and code are required'
             }, status=400)
 
-        result = telegram_service.verify_code(phone_number, code)
+        result = telegram_service.verify_code(phone_number, code, deadline=_request_deadline(request))
 
         if result['success']:
             # Store user session info
@@ -56,6 +107,9 @@ def verify_code(request):
         else:
             return JsonResponse(result, status=400)
 
+    except DeadlineExceeded as e:
+        return _deadline_exceeded_response(e)
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -67,7 +121,7 @@ def verify_code(request):
 def check_authentication(request):
     """Check if user is authenticated"""
     try:
-        is_authenticated = telegram_service.is_user_authenticated()
+        is_authenticated = telegram_service.is_user_authenticated(deadline=_request_deadline(request))
 
         return JsonResponse({
             'success': True,
@@ -75,6 +129,9 @@ def check_authentication(request):
             'user_data': request.session.get('user_data', None)
         })
 
+    except DeadlineExceeded as e:
+        return _deadline_exceeded_response(e)
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -83,16 +140,19 @@ def check_authentication(request):
 
 @csrf_exempt
 @require_http_methods(["GET"])
-def get_groups(request):
+async def get_groups(request):
     """Get all groups/chats"""
     try:
-        result = telegram_service.get_groups()
+        result = await _call_with_deadline(telegram_service.get_groups, deadline=_request_deadline(request))
 
         if result['success']:
             return JsonResponse(result)
         else:
             return JsonResponse(result, status=400)
 
+    except DeadlineExceeded as e:
+        return _deadline_exceeded_response(e)
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -101,18 +161,25 @@ def get_groups(request):
 
 @csrf_exempt
 @require_http_methods(["GET"])
-def get_messages(request, group_id):
+async def get_messages(request, group_id):
     """Get messages from a specific group"""
     try:
         limit = int(request.GET.get('limit', 100))
-        
-        result = telegram_service.get_messages(group_id, limit)
+        deadline = _request_deadline(request)
+
+        result = await _call_with_deadline(telegram_service.get_messages, group_id, limit, deadline=deadline)
 
         if result['success']:
-            return JsonResponse(result)
+            # Messages are serialised one at a time instead of building the whole body. ASGI
+            # servers buffer synchronous iterators completely, so they get an async one.
+            chunks = aiter_result_json(result) if isinstance(request, ASGIRequest) else iter_result_json(result)
+            return StreamingHttpResponse(chunks, content_type='application/json')
         else:
             return JsonResponse(result, status=400)
 
+    except DeadlineExceeded as e:
+        return _deadline_exceeded_response(e)
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -139,3 +206,77 @@ def logout(request):
             'success': False,
             'error': str(e)
         }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def get_analysis_job(request, job_id):
+    """Get the status and verdicts of a queued analysis job"""
+    try:
+        job = AnalysisJob.objects.filter(pk=job_id).first()
+
+        if not job:
+            return JsonResponse({
+                'success': False,
+                'error': 'Analysis job not found'
+            }, status=404)
+
+        return JsonResponse({
+            'success': True,
+            'job': {
+                'id': job.pk,
+                'chatId': job.chat_id,
+                'firstMessageId': str(job.first_message_id),
+                'lastMessageId': str(job.last_message_id),
+                'status': job.status,
+                'priority': job.priority,
+                'attempts': job.attempts,
+                'error': job.last_error or None,
+                'verdicts': job.result
+            }
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+@csrf_exempt
+@require_http_methods(["GET", "POST", "DELETE"])
+def group_backfill(request, group_id):
+    """Start (POST), pause (DELETE) or check (GET) a whole-history backfill of a group"""
+    try:
+        if request.method == "POST":
+            data = json.loads(request.body) if request.body else {}
+            started = start_backfill_thread(telegram_service, group_id, restart=bool(data.get('restart', False)))
+            if not started:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Backfill already running for this group'
+                }, status=409)
+        elif request.method == "DELETE":
+            if not pause_backfill(group_id):
+                return JsonResponse({
+                    'success': False,
+                    'error': 'No backfill running for this group'
+                }, status=404)
+
+        backfill = ChatBackfill.objects.filter(chat_id=str(group_id)).first()
+        if not backfill:
+            if request.method == "GET":
+                return JsonResponse({
+                    'success': False,
+                    'error': 'No backfill found for this group'
+                }, status=404)
+            backfill = ChatBackfill(chat_id=str(group_id))
+
+        return JsonResponse({
+            'success': True,
+            'backfill': backfill_status(backfill)
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
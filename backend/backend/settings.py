@@ -79,10 +79,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Analysis workers and the web server share this database
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The 'shared' cache is seen by every server and worker process. The database
+# backend needs `python manage.py createcachetable`. To use Redis (or any
+# Redis-protocol server) instead, install the `redis` package and switch to:
+#     'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#     'LOCATION': 'redis://127.0.0.1:6379',
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'ichat_shared_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -141,3 +167,48 @@ SESSION_SAVE_EVERY_REQUEST = True
 # Telegram API settings
 TELEGRAM_API_ID = 26603244
 TELEGRAM_API_HASH = 'c16129679c2a6bd437f094b9c3337466'
+
+# Analysis job queue settings
+# When enabled, get_messages queues AI analysis for `manage.py run_analysis_worker`
+# instead of running it inline, and returns stored verdicts once a job has finished.
+ANALYSIS_USE_JOB_QUEUE = False
+ANALYSIS_JOB_LEASE_SECONDS = 300
+ANALYSIS_JOB_RETRY_BASE_SECONDS = 5
+ANALYSIS_JOB_RETRY_MAX_SECONDS = 600
+# Workers delete finished jobs after this long; per-message verdicts are kept
+ANALYSIS_JOB_RETENTION_SECONDS = 86400
+ANALYSIS_JOB_PRUNE_INTERVAL_SECONDS = 3600
+
+# History backfill settings
+BACKFILL_PAGE_SIZE = 200
+BACKFILL_THROTTLE_SECONDS = 1.0
+BACKFILL_ANALYSIS_CHUNK_SIZE = 100
+# A running backfill not checkpointed for this long is treated as abandoned and can be resumed
+BACKFILL_LEASE_SECONDS = 300
+
+# Request deadline settings
+# Service calls are cancelled once a request's deadline passes. Clients may ask
+# for a shorter deadline with ?timeout=<seconds>.
+REQUEST_TIMEOUT_SECONDS = 30
+# get_messages returns unanalysed messages when less than this is left for AI analysis
+ANALYSIS_MIN_BUDGET_SECONDS = 2
+# Longest an inline Gemini request may run. It cannot be aborted once sent, even if the client disconnects
+ANALYSIS_INLINE_TIMEOUT_SECONDS = 10
+
+# Service cache settings
+# Groups, messages and AI verdicts are cached in process and in the shared cache
+# above; set SERVICE_CACHE_SHARED_ALIAS = None to keep the cache per process.
+SERVICE_CACHE_ENABLED = True
+SERVICE_CACHE_SHARED_ALIAS = 'shared'
+SERVICE_CACHE_LOCAL_MAX_ENTRIES = 1000
+SERVICE_CACHE_LOCK_TIMEOUT = 60
+GROUPS_CACHE_TTL = 30
+MESSAGES_CACHE_TTL = 30
+VERDICTS_CACHE_TTL = 86400
+
+# Fake news claim index settings
+# Messages whose word n-grams overlap a known fake claim by at least this
+# estimated Jaccard similarity are flagged without asking the LLM.
+CLAIM_MATCH_THRESHOLD = 0.7
+CLAIM_MIN_TOKENS = 4
+CLAIM_INDEX_REFRESH_SECONDS = 10